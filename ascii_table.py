@@ -35,6 +35,7 @@
 # pylint: disable=consider-using-assignment-expr
 
 import argparse
+import sys
 
 
 ascii_names = {
@@ -74,79 +75,72 @@ ascii_names = {
 }
 
 
+# The control character name for each byte value, or None.
+_CONTROL_NAMES = tuple(ascii_names.get(i) for i in range(256))
+
+
+def _glyph(i: int, fallback: str) -> str:
+    """Return the name or character for the byte value i.
+
+    :param int i: The byte value.
+    :param str fallback: Returned for characters that are not printable.
+    """
+    name = _CONTROL_NAMES[i]
+    if name is not None:
+        return name
+    c = chr(i)
+    if not c.isprintable():
+        c = fallback
+    return c
+
+
+# The glyphs for all byte values are fixed, so they are computed only once.
+_TEXT_LIST_GLYPHS = tuple(_glyph(i, '_') for i in range(256))
+_TEXT_TABLE_GLYPHS = tuple(_glyph(i, '???') for i in range(256))
+_HTML_LIST_GLYPHS = tuple(_glyph(i, f'&#x{i:02x};') for i in range(256))
+_HTML_TABLE_GLYPHS = tuple(name if name is not None else f'&#x{i:02x};'
+                           for i, name in enumerate(_CONTROL_NAMES))
+
+
 def text_list():
     """Output ASCII table as Python list."""
-    print('ascii_list = [')
+    lines = []
+    lines.append('ascii_list = [')
     for i in range(256):
-        if i in ascii_names:
-            c = ascii_names[i]
-        else:
-            c = str(chr(i))
-            if not c.isprintable():
-                c = '_'
+        c = _TEXT_LIST_GLYPHS[i]
         if c == "'":
-            print(f'    "{c}",  # {i} / 0x{i:02x} / {c}')
+            lines.append(f'    "{c}",  # {i} / 0x{i:02x} / {c}')
         elif c == '\\':
-            print(f"    '\\',  # {i} / 0x{i:02x} / BACKSLASH")
+            lines.append(f"    '\\',  # {i} / 0x{i:02x} / BACKSLASH")
         else:
-            print(f"    '{c}',  # {i} / 0x{i:02x} / {c}")
-    print(']')
+            lines.append(f"    '{c}',  # {i} / 0x{i:02x} / {c}")
+    lines.append(']')
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 
 def text_table():
     """Output ASCII table as text."""
-    h1 = '     |'
-    h2 = '=====+'
-    for lower_nibble in range(0, 16):
-        h1 += f'| {lower_nibble:04b} '
-        h2 += '+======'
+    h1 = '     |' + ''.join(f'| {lower_nibble:04b} ' for lower_nibble in range(0, 16))
+    h2 = '=====+' + '+======' * 16
+    s4 = '-----+' + '+------' * 16
     body = []
     for upper_nibble in range(0, 16):
-        s1 = '     |'
-        s2 = f'{upper_nibble:04b} |'
-        s3 = '     |'
-        s4 = '-----+'
-        for lower_nibble in range(0, 16):
-            i = (upper_nibble << 4) + lower_nibble
-            if i in ascii_names:
-                c = ascii_names[i]
-            else:
-                c = str(chr(i))
-                if not c.isprintable():
-                    c = '???'
-            s1 += f'| {i:#04x} '
-            s2 += f'|  {i:3d} '
-            s3 += f'| {c:4s} '
-            s4 += '+------'
-        body.append(s1)
-        body.append(s2)
-        body.append(s3)
+        row = range(upper_nibble << 4, (upper_nibble << 4) + 16)
+        body.append('     |' + ''.join([f'| {i:#04x} ' for i in row]))
+        body.append(f'{upper_nibble:04b} |' + ''.join([f'|  {i:3d} ' for i in row]))
+        body.append('     |' + ''.join([f'| {_TEXT_TABLE_GLYPHS[i]:4s} ' for i in row]))
         if upper_nibble < 15:
             body.append(s4)
 
-    print(h1)
-    print(h2)
-    for line in body:
-        print(line)
+    lines = [h1, h2]
+    lines.extend(body)
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 
 def html_list():
     """Print an ASCII Python 'list' in HTML format."""
-    h1 = '<tr>'
-    for lower_nibble in range(0, 16):
-        h1 += f'<th>{lower_nibble:04b}</th>'
-    h1 += '</tr>'
-    body = []
-    for upper_nibble in range(0, 16):
-        s = f'<tr><th>{upper_nibble:04b}</th>'
-        for lower_nibble in range(0, 16):
-            i = (upper_nibble << 4) + lower_nibble
-            c = ascii_names.get(i, f'&#x{i:02x};')
-            s += f'<td>{i:#04x}</br>{i:3d}</br>{c}</td>'
-        s += '</tr>'
-        body.append(s)
-
-    print('''<!DOCTYPE html>
+    lines = []
+    lines.append('''<!DOCTYPE html>
 <html>
 <head>
     <title>ASCII Table</title>
@@ -172,46 +166,36 @@ tr {
     <h1>ASCII Table</h1>
     <pre>
 ''')
-    print('ascii_list = [')
+    lines.append('ascii_list = [')
     for i in range(256):
-        if i in ascii_names:
-            c = ascii_names[i]
-        else:
-            c = str(chr(i))
-            if not c.isprintable():
-                c = f'&#x{i:02x};'
+        c = _HTML_LIST_GLYPHS[i]
         if c == "'":
-            print(f'    "{c}",  # {i} / 0x{i:02x} / {c}\r')
+            lines.append(f'    "{c}",  # {i} / 0x{i:02x} / {c}\r')
         elif c == '\\':
-            print(f"    '\\',  # {i} / 0x{i:02x} / BACKSLASH\r")
+            lines.append(f"    '\\',  # {i} / 0x{i:02x} / BACKSLASH\r")
         else:
-            print(f"    '{c}',  # {i} / 0x{i:02x} / {c}\r")
-    print(']')
+            lines.append(f"    '{c}',  # {i} / 0x{i:02x} / {c}\r")
+    lines.append(']')
 
-    print('''
+    lines.append('''
     </pre>
 </body>
 </html>
 ''')
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 
 def html_table():
     """Print an ASCII table in HTML format."""
-    h1 = '<tr>'
-    for lower_nibble in range(0, 16):
-        h1 += f'<th>{lower_nibble:04b}</th>'
-    h1 += '</tr>'
+    lines = []
+    h1 = '<tr>' + ''.join(f'<th>{lower_nibble:04b}</th>' for lower_nibble in range(0, 16)) + '</tr>'
     body = []
     for upper_nibble in range(0, 16):
-        s = f'<tr><th>{upper_nibble:04b}</th>'
-        for lower_nibble in range(0, 16):
-            i = (upper_nibble << 4) + lower_nibble
-            c = ascii_names.get(i, f'&#x{i:02x};')
-            s += f'<td>{i:#04x}</br>{i:3d}</br>{c}</td>'
-        s += '</tr>'
-        body.append(s)
-
-    print('''<!DOCTYPE html>
+        row = range(upper_nibble << 4, (upper_nibble << 4) + 16)
+        cells = ''.join([f'<td>{i:#04x}</br>{i:3d}</br>{_HTML_TABLE_GLYPHS[i]}</td>' for i in row])
+        body.append(f'<tr><th>{upper_nibble:04b}</th>{cells}</tr>')
+
+    lines.append('''<!DOCTYPE html>
 <html>
 <head>
     <title>ASCII Table</title>
@@ -238,14 +222,14 @@ tr {
     <table>
     <tr><th rowspan="2">Upper Nibble</th><th colspan="16">Lower Nibble</th></tr>
 ''')
-    print(h1)
-    for line in body:
-        print(line)
-    print('</table>')
-    print('''
+    lines.append(h1)
+    lines.extend(body)
+    lines.append('</table>')
+    lines.append('''
 </body>
 </html>
 ''')
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 
 def main():
@@ -34,12 +34,15 @@
 
 # pylint: disable=consider-using-assignment-expr
 
-from dataclasses import dataclass
+from collections.abc import Callable
+from dataclasses import dataclass, field
 import logging
+import os
+import selectors
 import socket
 
 
-@dataclass
+@dataclass(slots=True)
 class ChunkyStreamSocket:
     """Socket used to send message chunks over a TCP connection."""
     host: str = '127.0.0.1'
@@ -48,13 +51,125 @@ class ChunkyStreamSocket:
     logger: logging.Logger = logging.getLogger(__name__)
     debug: bool = False
     log_n_bytes: int = 0   # number of communicated bytes to log
-    _backlog_bytes: bytes = None
+    recv_buffer_size: int = 65536  # bytes to request per recv_into() call
+    tcp_nodelay: bool = True  # disable Nagle's algorithm
+    rcvbuf: int = 1 << 18  # SO_RCVBUF size, 0 keeps the system default
+    sndbuf: int = 1 << 18  # SO_SNDBUF size, 0 keeps the system default
+    _backlog_bytes: bytearray = None
+    _backlog_start: int = field(default=0, init=False, repr=False)
+    _recv_buffer: bytearray = field(default=None, repr=False)
+    _current_timeout: float = field(default=None, init=False, repr=False)
+    _is_listening: bool = field(default=False, init=False, repr=False)
+    _is_connected: bool = field(default=False, init=False, repr=False)
+    _search_from: int = field(default=0, init=False, repr=False)
 
     def __post_init__(self):
         """Custom initializer called after __init__().
         """
         if self.sock is None:
             self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        else:
+            # A socket passed in (e.g. from accept()) may already be connected.
+            try:
+                self.sock.getpeername()
+                self._is_connected = True
+            except OSError:
+                pass
+        if self._recv_buffer is None:
+            self._recv_buffer = bytearray(self.recv_buffer_size)
+        if self._backlog_bytes is not None:
+            # The backlog is extended in place, so it must be owned.
+            self._backlog_bytes = bytearray(self._backlog_bytes)
+        self._current_timeout = self.sock.gettimeout()
+
+    def _set_timeout(self, timeout: float):
+        """Set the socket timeout unless it is already set to that value.
+
+        Changing the timeout may require a system call, so it is skipped when
+        the value does not change.
+
+        :param float timeout: Timeout in seconds or None to block.
+        """
+        if timeout != self._current_timeout:
+            self.sock.settimeout(timeout)
+            self._current_timeout = timeout
+
+    def _configure_socket(self, sock: socket.socket):
+        """Apply the configured TCP options to the given socket.
+
+        :param socket.socket sock: The socket to configure.
+        """
+        if self.tcp_nodelay:
+            # Send small messages immediately instead of coalescing them.
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.rcvbuf > 0:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+        if self.sndbuf > 0:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.sndbuf)
+
+    def _backlog_available(self) -> int:
+        """Return the number of unread bytes in the backlog."""
+        if self._backlog_bytes is None:
+            return 0
+        return len(self._backlog_bytes) - self._backlog_start
+
+    def _consume_backlog(self, length: int):
+        """Mark length bytes at the start of the backlog as read.
+
+        Only the start offset is advanced, so the backlog is not copied.
+
+        :param int length: The number of bytes consumed.
+        """
+        self._backlog_start += length
+        if self._backlog_start >= len(self._backlog_bytes):
+            self._backlog_bytes = None
+            self._backlog_start = 0
+            self._search_from = 0
+
+    def _extend_backlog(self, data):
+        """Append the received data to the backlog.
+
+        The backlog is extended in place. The bytes that have already been
+        read are only removed once they make up more than half of it, so
+        each byte is moved a bounded number of times.
+
+        :param data: A bytes-like object with the received bytes.
+        """
+        if self._backlog_bytes is None:
+            self._backlog_bytes = bytearray(data)
+            return
+        start = self._backlog_start
+        if start > len(self._backlog_bytes) // 2:
+            del self._backlog_bytes[:start]
+            self._backlog_start = 0
+            self._search_from = max(0, self._search_from - start)
+        self._backlog_bytes += data
+
+    def _fill_backlog(self, length: int, timeout: float):
+        """Receive until the backlog holds at least length bytes.
+
+        Each call to the socket requests a full receive buffer, so a
+        sequence of small reads needs only one system call per buffer.
+
+        :param int length: The minimum number of bytes in the backlog.
+        :param float timeout: Timeout in seconds or None to block.
+        :raises: RuntimeError, TimeoutError
+        """
+        available = self._backlog_available()
+        if available >= length:
+            return
+        self._set_timeout(timeout)
+        recv_view = memoryview(self._recv_buffer)
+        while available < length:
+            nr_bytes = self.sock.recv_into(recv_view)
+            if self.debug:
+                self.logger.debug('socket.recv_into(%u) := %u bytes',
+                                  len(recv_view), nr_bytes)
+            if nr_bytes == 0:
+                self._is_connected = False
+                raise RuntimeError("socket connection broken")
+            self._extend_backlog(recv_view[:nr_bytes])
+            available += nr_bytes
 
     def bind_and_listen(self, backlog: int = 5, timeout: float = None):
         """Bind to the host and port to make a server socket.
@@ -65,13 +180,15 @@ class ChunkyStreamSocket:
         """
         self.logger.debug('bind_and_listen(%s:%u)', self.host, self.port)
         # Set the timeout.
-        self.sock.settimeout(timeout)
+        self._set_timeout(timeout)
         # Allow the server socket to re-bind immediately.
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._configure_socket(self.sock)
         # Bind the socket to the given address and port.
         self.sock.bind((self.host, self.port))
         # Start listening for a connection attempt.
         self.sock.listen(backlog)
+        self._is_listening = True
 
     def accept(self) -> tuple[int, tuple[str, int]]:
         """Accept a client connection on the (server) socket.
@@ -84,17 +201,25 @@ class ChunkyStreamSocket:
             (client_sock, client_addr) = self.sock.accept()  # pylint: disable=no-member
         except socket.timeout as ex:
             raise TimeoutError('accept() timed out') from ex
+        self._configure_socket(client_sock)
         self.logger.debug('accept(%s)', client_addr)
         return (client_sock, client_addr)
 
     def close(self):
-        """Close the socket."""
-        try:
-            self.sock.shutdown(socket.SHUT_RDWR)
-        except OSError:
-            # Ignore errors in shutdown since we close the socket anyways.
-            pass
+        """Close the socket.
+
+        Only a connected socket is shut down before closing it. Listening
+        sockets and broken connections skip the shutdown, which would fail.
+        """
+        if self._is_connected:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                # Ignore errors in shutdown since we close the socket anyways.
+                pass
         self.sock.close()
+        self._is_connected = False
+        self._is_listening = False
         self.sock = None
         self.logger.debug('close()')
 
@@ -107,15 +232,17 @@ class ChunkyStreamSocket:
         """
         self.logger.debug('connect(%s:%u)', self.host, self.port)
         # Set the timeout.
-        self.sock.settimeout(timeout)
+        self._set_timeout(timeout)
         # Allow server socket to re-bind immediately.
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._configure_socket(self.sock)
         try:
             self.sock.connect((self.host, self.port))
         except OSError as ex:
             self.logger.error('Connection attempt to %s:%u failed: %s',
                               self.host, self.port, ex)
             raise ConnectionError('unable to connect') from ex
+        self._is_connected = True
         self.logger.debug('Connected to %s:%s', self.host, self.port)
 
     def send(self, msg_bytes: bytes) -> int:
@@ -131,15 +258,80 @@ class ChunkyStreamSocket:
         :Raises:
         RuntimeError
         """
+        # Slicing a memoryview does not copy the remaining bytes.
+        msg_view = memoryview(msg_bytes)
+        msg_len = len(msg_view)
         total_nr_sent = 0
-        while total_nr_sent < len(msg_bytes):
-            current_nr_sent = self.sock.send(msg_bytes[total_nr_sent:])
+        while total_nr_sent < msg_len:
+            current_nr_sent = self.sock.send(msg_view[total_nr_sent:])
             if current_nr_sent == 0:
                 self.logger.debug('self.sock.send() failed.')
+                self._is_connected = False
                 raise RuntimeError("socket connection broken")
             total_nr_sent = total_nr_sent + current_nr_sent
-        if self.log_n_bytes != 0:
-            self.logger.debug('--> %s', msg_bytes[:self.log_n_bytes])
+        msg_view.release()
+        if self.log_n_bytes != 0 and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('--> %s', bytes(msg_bytes[:self.log_n_bytes]))
+        return total_nr_sent
+
+    def sendmany(self, messages, separator: bytes) -> int:
+        """Send several messages, each followed by the separator.
+
+        The messages are joined into a single buffer so they are handed to
+        the kernel in as few calls as possible.
+
+        :Parameters:
+        messages -- An iterable of bytes objects to send.
+        separator -- One or more bytes appended to each message.
+
+        :Return:
+        The number of bytes sent.
+
+        :Raises:
+        RuntimeError
+        """
+        framed = bytearray()
+        for message in messages:
+            framed += message
+            framed += separator
+        return self.send(framed)
+
+    def send_file(self, file, separator: bytes = b'') -> int:
+        """Send the contents of a file, optionally followed by a separator.
+
+        The file is sent using socket.sendfile(), which uses os.sendfile()
+        where available, so the data is not copied through user space. On
+        Linux, TCP_CORK is set while sending, so the file and the separator
+        are combined into full segments instead of sending a short segment
+        at the end.
+
+        :Parameters:
+        file -- A path or a file object opened in binary mode.
+        separator -- Bytes sent after the file contents.
+
+        :Return:
+        The number of bytes sent.
+
+        :Raises:
+        RuntimeError
+        """
+        cork = (bool(separator) and hasattr(socket, 'TCP_CORK')
+                and self.sock.family in (socket.AF_INET, socket.AF_INET6))
+        if cork:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1)
+        try:
+            if isinstance(file, (str, os.PathLike)):
+                with open(file, 'rb') as f:
+                    total_nr_sent = self.sock.sendfile(f)
+            else:
+                total_nr_sent = self.sock.sendfile(file)
+            if separator:
+                total_nr_sent += self.send(separator)
+        finally:
+            if cork:
+                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 0)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('send_file(%s) := %u bytes', file, total_nr_sent)
         return total_nr_sent
 
     def recv(self, length: int, timeout: float = None):
@@ -161,39 +353,77 @@ class ChunkyStreamSocket:
         RuntimeError
         TimeoutError
         """
-        chunks = []
+        if length == 0:
+            # Nothing to receive, so the backlog may not even exist.
+            return b''
+        if length < self.recv_buffer_size:
+            # Small reads are served from the backlog, which is refilled with
+            # as much data as the socket has available in a single call.
+            self._fill_backlog(length, timeout)
+            start = self._backlog_start
+            with memoryview(self._backlog_bytes) as backlog_view:
+                msg_bytes = backlog_view[start:start + length].tobytes()
+            self._consume_backlog(length)
+            if self.log_n_bytes != 0 and self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug('<-- %s', msg_bytes[:self.log_n_bytes])
+            return msg_bytes
+
+        msg_buf = bytearray(length)
+        self.recv_into(msg_buf, timeout)
+        return bytes(msg_buf)
+
+    def recv_into(self, buffer, timeout: float = None) -> int:
+        """Receive bytes from the socket until the buffer is full.
+
+        Unlike recv(), the bytes are placed directly into a buffer owned by
+        the caller, so no intermediate bytes object is created.
+
+        :Parameters:
+        buffer -- A writable bytes-like object (e.g. bytearray or memoryview)
+        that is filled completely.
+        timeout -- Timeout in seconds or None to block.
+
+        :Return:
+        The number of bytes received, which is len(buffer).
+
+        :Raises:
+        RuntimeError
+        TimeoutError
+        """
+        msg_view = memoryview(buffer).cast('B')
+        debug = self.debug and self.logger.isEnabledFor(logging.DEBUG)
+        length = len(msg_view)
         nr_received = 0
-        # Retrieve the backlog from the previous recv() call and use it as the
-        # first chunk.
-        if self._backlog_bytes is not None:
-            chunks.append(self._backlog_bytes)
-            nr_received = len(self._backlog_bytes)
-            self._backlog_bytes = None
+        # Retrieve the backlog from the previous receive call and use it as
+        # the start of the message.
+        available = self._backlog_available()
+        if available > 0:
+            nr_received = min(available, length)
+            start = self._backlog_start
+            with memoryview(self._backlog_bytes) as backlog_view:
+                msg_view[:nr_received] = backlog_view[start:start + nr_received]
+            self._consume_backlog(nr_received)
 
         # Set the timeout.
-        self.sock.settimeout(timeout)
+        self._set_timeout(timeout)
 
-        # Receive bytes until we have enough to satisfy the length requirement.
+        # Receive bytes directly into the message buffer until we have
+        # enough to satisfy the length requirement. Since we never ask for
+        # more than is missing, nothing ends up in the backlog.
         while nr_received < length:
-            recv_len = min(length - nr_received, 4096)
-            chunk = self.sock.recv(recv_len)
-            if self.debug:
-                self.logger.debug('socket.recv(%u) := %s', recv_len, chunk)
-            if chunk == b'':
+            recv_len = length - nr_received
+            nr_bytes = self.sock.recv_into(msg_view[nr_received:], recv_len)
+            if debug:
+                self.logger.debug('socket.recv_into(%u) := %u bytes', recv_len, nr_bytes)
+            if nr_bytes == 0:
+                self._is_connected = False
                 raise RuntimeError("socket connection broken")
-            chunks.append(chunk)
-            nr_received = nr_received + len(chunk)
-
-        # Join all chunks into one message.
-        msg_bytes = b''.join(chunks)
-        # Cut off the part that is too long.
-        if len(msg_bytes) > length:
-            self._backlog_bytes = msg_bytes[length:]
-            msg_bytes = msg_bytes[:length]
-
-        if self.log_n_bytes != 0:
-            self.logger.debug('<-- %s', msg_bytes[:self.log_n_bytes])
-        return msg_bytes
+            nr_received = nr_received + nr_bytes
+
+        if self.log_n_bytes != 0 and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('<-- %s', msg_view[:self.log_n_bytes].tobytes())
+        msg_view.release()
+        return nr_received
 
     def recv_to_separator(self, separator: bytes):
         """Receive bytes until the given separator is found.
@@ -203,6 +433,9 @@ class ChunkyStreamSocket:
         received, it is placed into a backlog buffer until the next call
         to a receive function.
 
+        The socket timeout is the one set by the most recent call to
+        connect(), bind_and_listen(), recv() or recv_into().
+
         :Parameters:
         separator -- One or more bytes that separate messages in the TCP
         stream.
@@ -215,40 +448,163 @@ class ChunkyStreamSocket:
         TimeoutError
         """
         self.logger.debug('recv_to_separator(%s)', separator)
-        start_search_index = 0
-        chunk = b''
-        msg_bytes = b''
+        separator_len = len(separator)
+        if separator_len == 1:
+            # Searching for an int takes the single-byte (memchr) fast path.
+            separator = separator[0]
+        recv_view = None
+        # Bind attributes used in every iteration to local names.
+        sock = self.sock
+        debug = self.debug and self.logger.isEnabledFor(logging.DEBUG)
+        log_debug = self.logger.debug
         while True:
-            if self._backlog_bytes is not None and len(self._backlog_bytes) > 0:
-                # The first time around, process the backlog.
-                chunk = self._backlog_bytes
-                self._backlog_bytes = None
-                if self.debug:
-                    self.logger.debug('backlog chunk = %s', chunk)
-            else:
-                chunk = self.sock.recv(4096)
-                if self.debug:
-                    self.logger.debug('socket.recv(4096) := %s', chunk)
-            if chunk == b'':
+            backlog = self._backlog_bytes
+            if backlog is not None:
+                # Search the backlog in place. Bytes that have already been
+                # searched by a previous call are skipped.
+                start = self._backlog_start
+                start_separator_index = backlog.find(
+                    separator, max(start, self._search_from))
+                if start_separator_index > -1:
+                    # Only the message itself is copied, once. The bytes
+                    # after the separator stay in the backlog for the next
+                    # call. The view is released before the backlog changes.
+                    with memoryview(backlog) as backlog_view:
+                        msg_bytes = backlog_view[start:start_separator_index].tobytes()
+                    self._consume_backlog(
+                        start_separator_index + separator_len - start)
+                    break
+                # The separator could have started in the backlog but
+                # finishes in the next chunk, so we need to search the
+                # len(separator) - 1 last bytes of the separator again.
+                self._search_from = max(start,
+                                        len(backlog) - (separator_len - 1))
+
+            # Read as much as is available in one call. Any bytes beyond the
+            # separator remain in the backlog for the next call.
+            if recv_view is None:
+                recv_view = memoryview(self._recv_buffer)
+            nr_bytes = sock.recv_into(recv_view)
+            if debug:
+                log_debug('socket.recv_into(%u) := %u bytes',
+                          len(recv_view), nr_bytes)
+            if nr_bytes == 0:
+                self._is_connected = False
                 raise RuntimeError("socket connection broken")
+            self._extend_backlog(recv_view[:nr_bytes])
+
+        if self.log_n_bytes != 0 and self.logger.isEnabledFor(logging.DEBUG):
+            log_debug('<-- %s', msg_bytes[:self.log_n_bytes])
+        return msg_bytes
 
-            msg_bytes = msg_bytes + chunk
-            start_separator_index = msg_bytes.find(separator, start_search_index)
-            if start_separator_index > -1:
-                # We found the separator at index start_separator_index.
-                self._backlog_bytes = msg_bytes[start_separator_index + len(separator):]
-                if self.debug:
-                    self.logger.debug('Backlog: %u bytes', self._backlog_bytes)
-                msg_bytes = msg_bytes[:start_separator_index]
+    def _try_consume(self, separator: bytes,
+                     on_message: Callable[['ChunkyStreamSocket', bytes], None],
+                     receive: bool = True) -> bool:
+        """Receive once and pass every complete message to on_message.
+
+        Incomplete data remains in the backlog, together with the position
+        up to which it has already been searched for the separator.
+
+        :Parameters:
+        separator -- One or more bytes that separate messages in the TCP
+        stream.
+        on_message -- Called with this instance and each message.
+        receive -- If False, only the backlog is processed.
+
+        :Return:
+        False if the peer has closed the connection, True otherwise.
+        """
+        connected = True
+        if receive:
+            nr_bytes = self.sock.recv_into(self._recv_buffer)
+            if self.debug:
+                self.logger.debug('socket.recv_into(%u) := %u bytes',
+                                  len(self._recv_buffer), nr_bytes)
+            if nr_bytes == 0:
+                self._is_connected = False
+                connected = False
+            else:
+                # The backlog is extended in place, so a message arriving
+                # in many parts is not copied again for every part.
+                with memoryview(self._recv_buffer) as recv_view:
+                    self._extend_backlog(recv_view[:nr_bytes])
+
+        backlog = self._backlog_bytes
+        if backlog is None:
+            return connected
+        separator_len = len(separator)
+        if separator_len == 1:
+            # Searching for an int takes the single-byte (memchr) fast path.
+            separator = separator[0]
+        start = self._backlog_start
+        search_from = max(start, self._search_from)
+        while True:
+            start_separator_index = backlog.find(separator, search_from)
+            if start_separator_index < 0:
                 break
-            # The separator could have started in the current chunk but
-            # finishes in the next chunk, so we need to search the
-            # len(separator) - 1 last bytes of the separator again
-            start_search_index = max(0, len(msg_bytes) - (len(separator) - 1))
+            # Copy the message once. The view is released before calling
+            # on_message, which may receive from this socket again.
+            with memoryview(backlog) as backlog_view:
+                msg_bytes = backlog_view[start:start_separator_index].tobytes()
+            on_message(self, msg_bytes)
+            start = start_separator_index + separator_len
+            search_from = start
+
+        if start < len(backlog):
+            # Keep the incomplete message and remember how far it has been
+            # searched.
+            self._backlog_start = start
+            self._search_from = max(start, len(backlog) - (separator_len - 1))
+        else:
+            self._backlog_bytes = None
+            self._backlog_start = 0
+            self._search_from = 0
+        return connected
+
+    @staticmethod
+    def pump(sockets: list['ChunkyStreamSocket'],
+             on_message: Callable[['ChunkyStreamSocket', bytes], None],
+             separator: bytes,
+             timeout: float = None):
+        """Receive separated messages from several sockets in one thread.
+
+        A selector waits until any of the sockets is readable, so no thread
+        per connection is needed. Each complete message is passed to
+        on_message together with the socket it was received on.
+
+        The function returns when all peers have closed their connections or
+        when no socket became readable within timeout seconds. A socket
+        whose connection fails is logged and removed, the other sockets
+        are still served.
 
-        if self.log_n_bytes != 0:
-            self.logger.debug('<-- %s', msg_bytes[:self.log_n_bytes])
-        return msg_bytes
+        :Parameters:
+        sockets -- The connected sockets to receive from.
+        on_message -- Called with the socket and each message.
+        separator -- One or more bytes that separate messages in the TCP
+        stream.
+        timeout -- Maximum time in seconds to wait for data, or None to wait
+        forever.
+        """
+        with selectors.DefaultSelector() as sel:
+            for cs in sockets:
+                # Messages may already be complete in the backlog.
+                cs._try_consume(separator, on_message, receive=False)  # pylint: disable=protected-access
+                sel.register(cs.sock, selectors.EVENT_READ, cs)
+            while sel.get_map():
+                events = sel.select(timeout)
+                if not events:
+                    break
+                for key, _ in events:
+                    cs = key.data
+                    try:
+                        connected = cs._try_consume(separator, on_message)  # pylint: disable=protected-access
+                    except (OSError, RuntimeError) as ex:
+                        cs.logger.error('pump(): receive from %s failed: %s',
+                                        key.fileobj, ex)
+                        cs._is_connected = False  # pylint: disable=protected-access
+                        connected = False
+                    if not connected:
+                        sel.unregister(key.fileobj)
 
 
 if __name__ == '__main__':
@@ -307,11 +663,13 @@ if __name__ == '__main__':
         start_barrier.wait()
         logger.info('client running')
         client_socket.connect()
-        for message in messages:
+        # Frame all messages once up front.
+        framed_messages = [message + MSG_SEP for message in messages]
+        for framed_message in framed_messages:
             try:
-                client_socket.send(message + MSG_SEP)
+                client_socket.send(framed_message)
             except RuntimeError as e:
-                logger.critical('send(%u) failed: %s', len(message + MSG_SEP), e)
+                logger.critical('send(%u) failed: %s', len(framed_message), e)
                 logger.critical('client terminating')
                 break
         try:
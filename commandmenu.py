@@ -44,6 +44,7 @@
     limitations under the License.
 """
 
+from collections import OrderedDict
 import logging
 import readline
 
@@ -65,35 +66,114 @@ class CommandItem:
         return s
 
 
+class TrieNode:
+    """A node in a prefix tree (trie) of words."""
+    def __init__(self):
+        self.children = {}
+        # All words in this subtree in the order they were inserted.
+        self._words = []
+
+    def insert(self, word: str):
+        """Add the word to the subtree starting at this node."""
+        node = self
+        node._words.append(word)
+        for c in word:
+            node = node.children.setdefault(c, TrieNode())
+            node._words.append(word)
+
+    def find(self, prefix: str):
+        """Return the node reached by following prefix, or None."""
+        node = self
+        for c in prefix:
+            node = node.children.get(c)
+            if node is None:
+                return None
+        return node
+
+    def words(self) -> tuple:
+        """Return all words in this subtree in the order they were inserted."""
+        return tuple(self._words)
+
+
 class CommandMenu:
     """Interactive text console menu."""
+    # Maximum number of cached completion results.
+    CACHE_SIZE = 128
+
     # https://pymotw.com/2/readline/
     def __init__(self,
                  vocabulary: dict = {'quit': []},
-                 prompt: str = '> '):
+                 prompt: str = '> ',
+                 dispatch: dict = None):
+        """Initialize the instance.
+
+        :param dict vocabulary: Maps each first word to the words that may
+            follow it.
+        :param str prompt: The prompt shown by input_loop().
+        :param dict dispatch: Maps a first word to the function called with
+            the list of remaining words when that command is entered.
+        """
         # Configuration members.
         self.prompt = prompt
-        self.vocabulary = vocabulary
+        self.dispatch = {} if dispatch is None else dispatch
+        # The candidates are never modified, so store them as tuples.
+        self.vocabulary = {key: tuple(sub_words)
+                           for key, sub_words in vocabulary.items()}
+        # Prefix trees of the first words and of the words that may follow
+        # each first word.
+        self._trie = TrieNode()
+        self._sub_tries = {}
+        for key, sub_words in self.vocabulary.items():
+            self._trie.insert(key)
+            sub_trie = TrieNode()
+            for word in sub_words:
+                sub_trie.insert(word)
+            self._sub_tries[key] = sub_trie
 
         # Dynamic members.
-        self.current_candidates = []
+        self.current_candidates = ()
+        # Most recently used candidate lists keyed by (first word, prefix).
+        self._cache = OrderedDict()
 
     def __str__(self):
         """A human-readable description of the instance."""
-        s = 'CommandMenu<'
-        first = True
-        for key, item in self.vocabulary.items():
-            if first:
-                s += str(item)
-                first = False
-            else:
-                s += f', {item:!s}'
-        s += '>'
-        return s
+        return ('CommandMenu<'
+                + ', '.join(str(item) for item in self.vocabulary.values())
+                + '>')
+
+    def _find_candidates(self, first: str, being_completed: str) -> tuple:
+        """Return the words that complete being_completed.
+
+        :param str first: The first word on the line, or '' if the first word
+            is being completed.
+        :param str being_completed: The part of the word typed so far.
+        :raise KeyError: if first is not in the vocabulary.
+        """
+        if first:
+            # later word
+            candidates = self.vocabulary[first]
+            trie = self._sub_tries[first]
+        else:
+            # first word
+            candidates = self.vocabulary.keys()
+            trie = self._trie
+
+        if not being_completed:
+            # matching empty string so use all candidates
+            return tuple(candidates)
+
+        # match vocabulary with portion of input being completed
+        node = trie.find(being_completed)
+        if node is None:
+            return ()
+        return node.words()
 
     def complete(self, text, state):
         """Command-line completion of the user text in the given state."""
         response = None
+        # Checked once per call, so the arguments are only formatted when
+        # they will actually be logged.
+        debug = logging.getLogger().isEnabledFor(logging.DEBUG)
         if state == 0:
             # This is the first time for this text, so build a match list.
             origline = readline.get_line_buffer()
@@ -102,52 +182,56 @@ class CommandMenu:
             being_completed = origline[begin:end]
             words = origline.split()
 
-            logging.debug('origline=%s', repr(origline))
-            logging.debug('begin=%s', begin)
-            logging.debug('end=%s', end)
-            logging.debug('being_completed=%s', being_completed)
-            logging.debug('words=%s', words)
+            if debug:
+                logging.debug('origline=%r', origline)
+                logging.debug('begin=%s', begin)
+                logging.debug('end=%s', end)
+                logging.debug('being_completed=%s', being_completed)
+                logging.debug('words=%s', words)
 
             if not words:
                 self.current_candidates = sorted(self.vocabulary.keys())
             else:
+                first = words[0] if begin > 0 else ''
+                cache_key = (first, being_completed)
                 try:
-                    if begin == 0:
-                        # first word
-                        candidates = self.vocabulary.keys()
-                    else:
-                        # later word
-                        first = words[0]
-                        candidates = self.vocabulary[first]
-
-                    if being_completed:
-                        # match vocabulary with portion of input
-                        # being completed
-                        self.current_candidates = \
-                            [w for w in candidates if w.startswith(being_completed)]
-                    else:
-                        # matching empty string so use all candidates
-                        self.current_candidates = candidates
-
+                    self.current_candidates = self._cache[cache_key]
+                    self._cache.move_to_end(cache_key)
+                except KeyError:
+                    try:
+                        self.current_candidates = self._find_candidates(
+                            first, being_completed)
+                        self._cache[cache_key] = self.current_candidates
+                        if len(self._cache) > self.CACHE_SIZE:
+                            self._cache.popitem(last=False)
+                    except (KeyError, IndexError) as err:
+                        logging.error('completion error: %s', err)
+                        self.current_candidates = ()
+                if debug:
                     logging.debug('candidates=%s', self.current_candidates)
 
-                except (KeyError, IndexError) as err:
-                    logging.error('completion error: %s', err)
-                    self.current_candidates = []
-
         try:
             response = self.current_candidates[state]
         except IndexError:
             response = None
-        logging.debug('complete(%s, %s) => %s', repr(text), state, response)
+        if debug:
+            logging.debug('complete(%r, %s) => %s', text, state, response)
         return response
 
     def input_loop(self):
-        """Loop to get input."""
-        line = ''
-        while line != 'quit':
+        """Loop to get input and dispatch it until 'quit' is entered."""
+        while True:
             line = input(self.prompt)
-            print(f'Dispatch {line}')
+            if line == 'quit':
+                break
+            words = line.split()
+            if not words:
+                continue
+            function = self.dispatch.get(words[0])
+            if function is None:
+                print(f'Unknown: {line}')
+            else:
+                function(words[1:])
 
 
 if __name__ == '__main__':
@@ -156,6 +240,10 @@ if __name__ == '__main__':
         'list': ['files', 'directories'],
         'print': ['byname', 'bysize'],
         'stop': [],
+    }, dispatch={
+        'list': lambda args: print(f'Listing {args}'),
+        'print': lambda args: print(f'Printing {args}'),
+        'stop': lambda args: print(f'Stopping {args}'),
     })
     readline.set_completer(cm.complete)
 
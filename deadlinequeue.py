@@ -33,6 +33,7 @@
 """
 
 import heapq
+import itertools
 import logging
 import sys
 import threading
@@ -63,8 +64,9 @@ class DeadlineQueue:
         logger -- The logger used by the instance. If no logger is specified,
         a default logger will be used.
         """
-        # A counter used to create unique idx numbers used for sorting."""
-        self._count = 0
+        # A counter used to create unique idx numbers used for sorting.
+        # next() on it is a single atomic call, so no lock is needed.
+        self._counter = itertools.count()
         # A condition used to lock access to the queue.
         self._cv = threading.Condition()
         # The logger used to output information.
@@ -77,17 +79,10 @@ class DeadlineQueue:
 
     def __repr__(self):
         """Return a human-readable string representation of the instance."""
-        s = '['
-        not_first = False
+        # Copy the queue under the lock and format it after releasing it.
         with self._cv:
-            for item in self._queue:
-                if not_first:
-                    s = s + f', {item[2]} @ {item[0]}'
-                else:
-                    not_first = True
-                    s = s + f'{item[2]} @ {item[0]}'
-        s = s + ']'
-        return s
+            snapshot = list(self._queue)
+        return '[' + ', '.join(f'{item[2]} @ {item[0]}' for item in snapshot) + ']'
 
     def put(self, item_tuple):
         """Place a tuple in the queue.
@@ -97,16 +92,18 @@ class DeadlineQueue:
         """
         deadline = item_tuple[0]
         item = item_tuple[1]
-        # Lock access to the queue by grabbing the condition.
+        idx = next(self._counter)
+        # Lock access to the queue by grabbing the condition. Only the heap
+        # update and the notification need the lock.
         with self._cv:
-            heapq.heappush(self._queue, (deadline, self._count, item))
-            self._logger.debug(
-                'put(#%u - %s @ %.6f s at %.6f s',
-                self._count, item, deadline, time.perf_counter())
-            self._count += 1
+            heapq.heappush(self._queue, (deadline, idx, item))
             # Notify anyone waiting on the condition that the queue has
             # changed.
             self._cv.notify()
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(
+                'put(#%u - %s @ %.6f s at %.6f s',
+                idx, item, deadline, time.perf_counter())
 
     def get(self):
         """Return the first element in the queue and remove it.
@@ -118,9 +115,78 @@ class DeadlineQueue:
             while len(self._queue) == 0:
                 self._cv.wait()
             element = heapq.heappop(self._queue)
-        self._logger.debug(
-            'get(#%u - %s @ %.6f s at %.6f s',
-            element[1], element[2], element[0], time.perf_counter())
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(
+                'get(#%u - %s @ %.6f s at %.6f s',
+                element[1], element[2], element[0], time.perf_counter())
+        return element
+
+    def get_when_due(self, timeout: float = None):
+        """Wait until the first element is due, then remove and return it.
+
+        Instead of polling, the caller sleeps on the condition until the
+        deadline of the first element expires or a new element is put into
+        the queue.
+
+        The element will be tuple (deadline, count, item).
+
+        :Parameters:
+        timeout -- The maximum number of seconds to wait or None to wait
+        until an element is due.
+
+        :Return:
+        The element or None if no element became due within timeout.
+        """
+        if timeout is not None:
+            end_s = time.perf_counter() + timeout
+        with self._cv:
+            while True:
+                current_s = time.perf_counter()
+                if len(self._queue) > 0:
+                    delay = self._queue[0][0] - current_s
+                    if delay <= 0:
+                        element = heapq.heappop(self._queue)
+                        break
+                else:
+                    delay = None
+                if timeout is not None:
+                    remaining = end_s - current_s
+                    if remaining <= 0:
+                        return None
+                    if delay is None or remaining < delay:
+                        delay = remaining
+                if delay is not None:
+                    delay = min(delay, threading.TIMEOUT_MAX)
+                self._cv.wait(delay)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(
+                'get_when_due(#%u - %s @ %.6f s at %.6f s',
+                element[1], element[2], element[0], time.perf_counter())
+        return element
+
+    def get_or_delay(self):
+        """Remove and return the first element if it is due.
+
+        The check and the removal are made while holding the lock once, so a
+        caller running its own event loop does not need a peek() followed
+        by a get().
+
+        :Return:
+        The element tuple (deadline, count, item) if it is due, the number
+        of seconds until the first element becomes due otherwise, or None
+        if the queue is empty.
+        """
+        with self._cv:
+            if len(self._queue) == 0:
+                return None
+            delay = self._queue[0][0] - time.perf_counter()
+            if delay > 0:
+                return delay
+            element = heapq.heappop(self._queue)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(
+                'get_or_delay(#%u - %s @ %.6f s at %.6f s',
+                element[1], element[2], element[0], time.perf_counter())
         return element
 
     def peek(self):
@@ -138,10 +204,27 @@ class DeadlineQueue:
             element[1], element[2], element[0])
         return element
 
+    def try_peek(self):
+        """Return the first element in the queue without waiting.
+
+        The queue is read without acquiring the lock. This is safe because
+        indexing a list is atomic in CPython.
+
+        :Return:
+        The element tuple (deadline, count, item) or None if the queue is
+        empty.
+        """
+        try:
+            return self._queue[0]
+        except IndexError:
+            return None
+
     def qsize(self):
-        """Return the number of elements in the queue."""
-        with self._cv:
-            return len(self._queue)
+        """Return the number of elements in the queue.
+
+        The lock is not needed, since len() of a list is atomic in CPython.
+        """
+        return len(self._queue)
 
 
 if __name__ == '__main__':
@@ -185,16 +268,14 @@ if __name__ == '__main__':
         start_barrier.wait()
         items = 0
         while True:
-            # Peek at the data.
-            (deadline, idx, data) = dq_in.peek()
-            current_s = time.perf_counter()
-            if deadline > current_s:
+            # Sleep until the first element in the queue is due.
+            element = dq_in.get_when_due(timeout=0.1)
+            if element is None:
                 if terminate_event.is_set():
                     break
                 continue
-
-            # Get the first element in the queue.
-            (deadline, idx, data) = dq_in.get()
+            (deadline, idx, data) = element
+            current_s = time.perf_counter()
             items = items + 1
 
             if data is _sentinel:
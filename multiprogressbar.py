@@ -44,8 +44,8 @@
           'decimals': 1,
           'bar_length': 30},
     ]
-    prepare_bars(config)
-    print_bars(config)
+    bars = prepare_bars(config)
+    print_bars(bars)
 
     AUTHOR
     Christian Dönges, Platypus Projects GmbH www.platypus-projects.de
@@ -76,6 +76,7 @@
 """
 
 import enum
+import functools
 import sys
 from time import sleep
 
@@ -101,6 +102,57 @@ class BAR_COLORS(enum.Enum):
     BrightWhite = '\033[1;37m'
 
 
+# Escape sequences used for every bar, resolved once.
+_RESET_COLOR = BAR_COLORS.Black.value
+_CLEAR_LINE = '\x1b[2K\r'
+
+
+def _color_str(bar_color) -> str:
+    """Return the ANSI escape sequence for a BAR_COLORS member or string."""
+    if isinstance(bar_color, BAR_COLORS):
+        return bar_color.value
+    return bar_color
+
+
+@functools.lru_cache(maxsize=256)
+def _bar_str(filled_length: int, bar_length: int) -> str:
+    """Return the bar characters for the given fill level.
+
+    There are only bar_length + 1 distinct bars per length, so the strings
+    are cached instead of being rebuilt on every refresh.
+    """
+    return '█' * filled_length + '-' * (bar_length - filled_length)
+
+
+def _format_single_bar(
+        current_iteration: int,
+        total_iterations: int,
+        prefix: str = '',
+        suffix: str = '',
+        decimals: int = 1,
+        bar_length: int = 80,
+        bar_color: str = '\033[30m') -> str:
+    """Return the output for a single progress bar.
+
+    The parameters are the same as for print_single_bar(), except that
+    bar_color must be an ANSI escape sequence string.
+    """
+    current_iteration = min(current_iteration, total_iterations)
+
+    if total_iterations > 0:
+        ratio = current_iteration / total_iterations
+        filled_length = int(round(bar_length * ratio))
+    else:
+        # Nothing to do is the same as being done.
+        ratio = 1.0
+        filled_length = bar_length
+    percents = f'{100 * ratio:.{decimals}f}'
+    the_bar = _bar_str(filled_length, bar_length)
+
+    return (f'{_CLEAR_LINE}{prefix} |{bar_color}{the_bar}'
+            f'{_RESET_COLOR}| {percents}% {suffix}')
+
+
 def print_single_bar(
         current_iteration: int,
         total_iterations: int,
@@ -116,40 +168,96 @@ def print_single_bar(
     :param str prefix: a string that will be output before the bar
     :param str suffix: a string that will be output after the bar
     :param int bar_length: the length of the bar in characters
+    :param bar_color: the color of the bar, either a BAR_COLORS member or
+        an ANSI escape sequence string
     """
-    current_iteration = min(current_iteration, total_iterations)
-
-    percents = f'{100 * (current_iteration / float(total_iterations)):.{decimals}f}'
-    filled_length = int(round(bar_length * current_iteration / float(total_iterations)))
-    the_bar = f'{"█" * filled_length}{"-" * (bar_length - filled_length)}'
+    sys.stdout.write(_format_single_bar(
+        current_iteration, total_iterations, prefix, suffix, decimals,
+        bar_length, _color_str(bar_color)))
 
-    sys.stdout.write(
-        f'\x1b[2K\r{prefix} |{bar_color.value}{the_bar}'
-        f'{BAR_COLORS.Black.value}| {percents}% {suffix}')
 
+class BarConfig:
+    """The parameters of a single progress bar.
 
-def prepare_bars(configs: list):
-    """Print to prepare for the bars."""
-    for c in configs:
-        sys.stdout.write('\n')
+    The attributes have the same names and meaning as the keys of the
+    configuration dictionaries.
+    """
+    __slots__ = ('current_iteration', 'total_iterations', 'prefix', 'suffix',
+                 'decimals', 'bar_length', '_bar_color')
+
+    def __init__(self,
+                 current_iteration: int,
+                 total_iterations: int,
+                 prefix: str = '',
+                 suffix: str = '',
+                 decimals: int = 1,
+                 bar_length: int = 80,
+                 bar_color: str = _RESET_COLOR):
+        self.current_iteration = current_iteration
+        self.total_iterations = total_iterations
+        self.prefix = prefix
+        self.suffix = suffix
+        self.decimals = decimals
+        self.bar_length = bar_length
+        self.bar_color = bar_color
+
+    @property
+    def bar_color(self) -> str:
+        """The ANSI escape sequence for the color of the bar."""
+        return self._bar_color
+
+    @bar_color.setter
+    def bar_color(self, bar_color):
+        # Convert a BAR_COLORS member once instead of on every refresh.
+        self._bar_color = _color_str(bar_color)
+
+    @classmethod
+    def from_dict(cls, config: dict) -> 'BarConfig':
+        """Create a bar configuration from a configuration dictionary.
+
+        Missing keys get their default values, unknown keys are ignored.
+        """
+        return cls(config['current_iteration'],
+                   config['total_iterations'],
+                   config.get('prefix', ''),
+                   config.get('suffix', ''),
+                   config.get('decimals', 1),
+                   config.get('bar_length', 80),
+                   config.get('bar_color', _RESET_COLOR))
+
+
+def prepare_bars(configs: list) -> list[BarConfig]:
+    """Print to prepare for the bars.
+
+    :param list configs: the bar configurations, either dictionaries or
+        BarConfig instances
+    :return: the configurations as BarConfig instances, to be updated and
+        passed to print_bars()
+    """
+    sys.stdout.write('\n' * len(configs))
+    return [c if isinstance(c, BarConfig) else BarConfig.from_dict(c)
+            for c in configs]
 
 
 def print_bars(configs: list):
-    """Print progress bars."""
+    """Print progress bars.
+
+    :param list configs: the bar configurations as returned by
+        prepare_bars(). Dictionaries are still accepted and are converted
+        with BarConfig.from_dict() on every call.
+    """
+    # Collect all output and write it at once.
     # Move the cursor up to the start of the line of the first bar.
-    for n in range(len(configs)):
-        sys.stdout.write('\033[F')  # up
+    buf = ['\033[F' * len(configs)]
 
     for config in configs:
-        ci = config['current_iteration']
-        ti = config['total_iterations']
-        prefix = config.get('prefix', '')
-        suffix = config.get('suffix', '') + '\033[K\n'
-        decimals = config.get('decimals', 1)
-        bar_length = config.get('bar_length', 80)
-        bar_color = config.get('bar_color', BAR_COLORS.Black)
-        print_single_bar(ci, ti, prefix, suffix, decimals, bar_length,
-                         bar_color)
+        if not isinstance(config, BarConfig):
+            config = BarConfig.from_dict(config)
+        buf.append(_format_single_bar(
+            config.current_iteration, config.total_iterations,
+            config.prefix, config.suffix + '\033[K\n', config.decimals,
+            config.bar_length, config.bar_color))
+    sys.stdout.write(''.join(buf))
     sys.stdout.flush()
 
 
@@ -185,11 +293,11 @@ def main():
             'prefix': 'Jolly'
         },
     ]
-    prepare_bars(configs)
+    bars = prepare_bars(configs)
     for i in range(100):
-        print_bars(configs)
-        for config in configs:
-            config['current_iteration'] += 1
+        print_bars(bars)
+        for bar in bars:
+            bar.current_iteration += 1
         sleep(.1)
 
 
@@ -13,7 +13,7 @@
 """A skeleton (= template) for a Python 3.x command line tool.
 
    The skeleton application is capable of parsing command line options and
-   logging to the console and/or syslogd.
+   logging to the console and, with --syslog, to syslogd.
 
    Has been tested under:
        - Python 3.7.2 Linux (Debian 9), macOS 10.13 & 10.14 (via macports),
@@ -45,20 +45,60 @@
 """
 
 import argparse
+import functools
 import logging
+import os
+import stat
 import sys
 
 
-logger = None
+logger = logging.getLogger(__name__)
 
+# Define a new log level 'trace'. This is done once on import, so
+# initializeLogging() may be called repeatedly.
+logging.TRACE = 9
+logging.addLevelName(logging.TRACE, 'TRACE')
 
-def parseCommandLineArguments(argv: list) -> argparse.Namespace:
-    """Parse command-line arguments.
 
-        :param list argv: A list of strings that will be parsed.
+def _trace(self, message, *args, _level=logging.TRACE, **kws):
+    """Output message with level TRACE."""
+    if self.isEnabledFor(_level):
+        # Logger takes its '*args' as 'args'.
+        self._log(_level, message, args, **kws)
 
-        :return: A populated namespace containing the parsed arguments.
-        :rtype: NamedTuple
+
+if not hasattr(logging.Logger, 'trace'):
+    logging.Logger.trace = _trace
+
+# Map the names accepted by --loglevel to the numeric log levels.
+_LEVELS = {
+    'CRITICAL': logging.CRITICAL,
+    'ERROR': logging.ERROR,
+    'WARNING': logging.WARNING,
+    'INFO': logging.INFO,
+    'DEBUG': logging.DEBUG,
+    'TRACE': logging.TRACE,
+}
+
+# The name of the application, used for the log file and syslogd messages.
+_APP_NAME = sys.argv[0]
+
+# The formatters used by the handlers. They do not depend on the arguments,
+# so they are created once.
+_VERBOSE_FMT = logging.Formatter(
+    '%(asctime)s %(name)-12s %(levelname)-8s %(message)s')
+_TERSE_FMT = logging.Formatter('%(levelname)-8s %(message)s')
+_SYSLOG_FMT = logging.Formatter(_APP_NAME + ' %(levelname)-8s %(message)s')
+
+
+@functools.lru_cache(maxsize=1)
+def _get_parser() -> argparse.ArgumentParser:
+    """Return the command-line argument parser.
+
+        The parser is built on the first call and reused afterwards.
+
+        :return: The parser for the command-line arguments.
+        :rtype: argparse.ArgumentParser
     """
     parser = argparse.ArgumentParser(
         description='skeleton app.')
@@ -67,13 +107,26 @@ def parseCommandLineArguments(argv: list) -> argparse.Namespace:
                         help='Enable debug mode, which writes a TRACE log to a file.')
     parser.add_argument('--loglevel', '-l', dest='loglevel',
                         default='ERROR', action='store',
-                        choices=['CRITICAL', 'ERROR',
-                                 'WARNING', 'INFO', 'DEBUG'],
+                        choices=list(_LEVELS),
                         help='The minimum level of messages that will be logged.')
     parser.add_argument('--verbose', '-v', dest='verbose',
                         default=False, action='store_true',
                         help='Enable verbose mode, which write a lot more output to the console.')
-    args = parser.parse_args(argv)
+    parser.add_argument('--syslog', '-s', dest='syslog',
+                        default=False, action='store_true',
+                        help='Also send log messages to syslogd.')
+    return parser
+
+
+def parseCommandLineArguments(argv: list) -> argparse.Namespace:
+    """Parse command-line arguments.
+
+        :param list argv: A list of strings that will be parsed.
+
+        :return: A populated namespace containing the parsed arguments.
+        :rtype: NamedTuple
+    """
+    args = _get_parser().parse_args(argv)
 
     if args.debug:
         print('Using arguments:', args)
@@ -94,36 +147,18 @@ def initializeLogging(args: argparse.Namespace):
         :rtype: logging
     """
 
-    # Define a new log level 'trace'
-    logging.TRACE = 9
-    logging.addLevelName(logging.TRACE, 'TRACE')
-
-    def trace(self, message, *args, **kws):
-        """Output message with level TRACE."""
-        if self.isEnabledFor(logging.TRACE):
-            # Logger takes its '*args' as 'args'.
-            self._log(logging.TRACE, message, args, **kws)
-
-    logging.Logger.trace = trace
-
     # args.loglevel contains the string value of the command line option
     # --loglevel.
-    numeric_log_level = getattr(logging, args.loglevel.upper(), None)
-    if not isinstance(numeric_log_level, int):
-        raise ValueError('Invalid log level: %s', args.loglevel)
+    # argparse has already checked the choices, but initializeLogging() may
+    # also be called with a namespace that was not created by argparse.
+    try:
+        numeric_log_level = _LEVELS[args.loglevel.upper()]
+    except KeyError:
+        raise ValueError(f'Invalid log level: {args.loglevel}') from None
 
     # Configure the root logger instance.
-    global logger
-    logger = logging.getLogger()
-    logger.setLevel(numeric_log_level)
-
-    appName = sys.argv[0]
-
-    fh = None
-    if args.debug:
-        # Create file handler.
-        fh = logging.FileHandler(appName + '.log')
-        fh.setLevel(logging.TRACE)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(numeric_log_level)
 
     # Create a console handler.
     ch = logging.StreamHandler()
@@ -131,10 +166,19 @@ def initializeLogging(args: argparse.Namespace):
         ch.setLevel(logging.DEBUG)
     else:
         ch.setLevel(logging.WARNING)
+    ch.setFormatter(_TERSE_FMT)
+    handlers = [ch]
+
+    if args.debug:
+        # Create file handler. Without --debug, no file is touched.
+        fh = logging.FileHandler(_APP_NAME + '.log')
+        fh.setLevel(logging.TRACE)
+        fh.setFormatter(_VERBOSE_FMT)
+        handlers.append(fh)
 
-    # Create a handler to log to syslogd. If a non-default address and port
-    # are required, add an argument (address, port). It is also possible
-    # to specify the facility and socket type.
+    # Create a handler to log to syslogd if requested. If a non-default
+    # address and port are required, add an argument (address, port). It is
+    # also possible to specify the facility and socket type.
     # See http://docs.python.org/library/logging.handlers.html#logging.handlers.SysLogHandler
     # Example:
     # sh = SysLogHandler(('localhost', 541), facility=LOG_AUTH,
@@ -143,57 +187,54 @@ def initializeLogging(args: argparse.Namespace):
     # socket instead of UDP port 541. Some known domain sockets are tried
     # before trying UDP. If this is not what you want, change it.
     # If you need a different domain socket, add it to the list.
-    from logging.handlers import SysLogHandler
-    import socket
-    sh = None
     syslogdConfig = ''
-    # Try the domain sockets for Linux, Mac OS X.
-    for domainSocket in ('/dev/log', '/var/run/syslog'):
-        try:
-            sh = SysLogHandler(domainSocket)
-            syslogdConfig = domainSocket
-            break
-        except socket.error:
-            pass
-        except AttributeError:
-            # MS Windows does not know socket.AF_UNIX, so trying domain
-            # sockets will fail. In this case, we give up looping.
-            break
-    if not sh:
-        # Unable to connect using a domain socket, so try localhost:541.
-        sh = SysLogHandler()
-        syslogdConfig = 'localhost:541 (UDP)'
-
-    # Create a formatter and add it to the handlers.
-    verboseFormatter = logging.Formatter(
-        '%(asctime)s %(name)-12s %(levelname)-8s %(message)s')
-    terseFormatter = logging.Formatter('%(levelname)-8s %(message)s')
-    syslogFormatter = logging.Formatter(
-        appName + ' %(levelname)-8s %(message)s')
-    ch.setFormatter(terseFormatter)
-    if fh:
-        fh.setFormatter(verboseFormatter)
-    if sh:
-        sh.setFormatter(syslogFormatter)
+    if args.syslog:
+        sh = None
+        # Only import what is needed for syslogd when it is actually used.
+        from logging.handlers import SysLogHandler
+        import socket
+        # MS Windows does not know socket.AF_UNIX, so trying domain sockets
+        # would fail.
+        if sys.platform != 'win32' and hasattr(socket, 'AF_UNIX'):
+            # Try the domain sockets for Linux, Mac OS X. Paths that are not
+            # sockets are skipped without trying to connect.
+            for domainSocket in ('/dev/log', '/var/run/syslog'):
+                try:
+                    if not stat.S_ISSOCK(os.stat(domainSocket).st_mode):
+                        continue
+                    sh = SysLogHandler(domainSocket)
+                    syslogdConfig = domainSocket
+                    break
+                except OSError:
+                    pass
+        if not sh:
+            # Unable to connect using a domain socket, so try localhost:541.
+            sh = SysLogHandler()
+            syslogdConfig = 'localhost:541 (UDP)'
+        sh.setFormatter(_SYSLOG_FMT)
+        handlers.append(sh)
 
     # Add the handlers to the logger.
-    logger.addHandler(ch)
-    if fh:
-        logger.addHandler(fh)
-    if sh:
-        logger.addHandler(sh)
+    for handler in handlers:
+        root_logger.addHandler(handler)
+    if syslogdConfig:
         logger.info('syslogd connection using %s.', syslogdConfig)
     logger.info('Logging initialized.')
-    logger.debug(args)
-    return logger
+    logger.debug('Arguments: %s', args)
+    return root_logger
 
 
 def performSkeleton():
     '''Do what the program is supposed to do.'''
 
     # 'application' code
-    logger.debug('debug message')
-    logger.info('info message')
+    # DEBUG and INFO are filtered out by default, so check the level before
+    # building messages that are expensive to create.
+    isEnabledFor = logger.isEnabledFor
+    if isEnabledFor(logging.DEBUG):
+        logger.debug('debug message')
+    if isEnabledFor(logging.INFO):
+        logger.info('info message')
     logger.warning('warn message')
     logger.error('error message')
     logger.critical('critical message')
@@ -207,8 +248,7 @@ def main(argv: list):
     args = parseCommandLineArguments(argv[1:])
 
     # Set up logging.
-    global logger
-    logger = initializeLogging(args)
+    initializeLogging(args)
 
     performSkeleton()
 
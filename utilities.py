@@ -38,69 +38,194 @@
 # pylint: disable=invalid-name
 
 import argparse
+import atexit
 import codecs
 import contextlib
 import ctypes
+import functools
 import glob
 import gzip
 import locale
 import logging
 import os
+import queue
 import shutil
+import stat
 import sys
+import threading
 import traceback
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 
 # Globals (use sparingly)
 logger = logging.getLogger(__name__)
+# The listener writing queued log records if asynchronous logging is used.
+log_listener = None
+# The handler feeding log_listener, attached to the root logger.
+_log_queue_handler = None
 
+# True once logging_add_trace() has installed Logger.trace(). The lock
+# serializes the installation and the call counter.
+_trace_installed = False
+_trace_nr_calls = 0
+_trace_lock = threading.Lock()
 
+# Define a new log level 'trace' once on import. If another module has
+# already registered the name, its level is kept, but logging.TRACE is set
+# in any case because trace() relies on it.
+logging.TRACE = logging._nameToLevel.get('TRACE', 9)  # pylint: disable=protected-access
+logging.addLevelName(logging.TRACE, 'TRACE')
+
+
+def trace(fn_logger: logging.Logger, message: str, *args, **kws):
+    """Log message with level TRACE to fn_logger.
+
+        This works with any logger, even if logging_add_trace() has not been
+        called.
+
+        :param logging.Logger fn_logger: The logger to log to.
+        :param str message: The message, formatted with args like any other
+            log message.
+    """
+    if fn_logger.isEnabledFor(logging.TRACE):
+        # Report the caller of trace() as the origin of the record.
+        kws.setdefault('stacklevel', 2)
+        # Logger takes its '*args' as 'args'.
+        fn_logger._log(logging.TRACE, message, args, **kws)  # pylint: disable=protected-access
+
+
+def _logger_trace(self, message, *args, **kws):
+    """Output message with level TRACE."""
+    if self.isEnabledFor(logging.TRACE):
+        # Report the caller of trace() as the origin of the record.
+        kws.setdefault('stacklevel', 2)
+        # Logger takes its '*args' as 'args'.
+        self._log(logging.TRACE, message, args, **kws)  # pylint: disable=protected-access
+
+
+# The name of the application used for %P in string_from_format().
+# Embedded interpreters may have an empty sys.argv.
+_APP_STEM = Path(sys.argv[0]).stem if sys.argv else ''
+
+# Buffer size used by rotate_file() when compressing a file.
+_ROTATE_COPY_BUFFER_SIZE = 1 << 20
+
+# Buffer size used by std_open() for files opened for writing.
+_STD_OPEN_WRITE_BUFFER_SIZE = 1 << 20
+
+# The formatters used by the logging handlers. They do not depend on the
+# arguments, so they are created once and shared.
+_TERSE_FMT = logging.Formatter('%(levelname)-8s %(message)s')
+_VERBOSE_FMT = logging.Formatter(
+    '%(asctime)s %(name)-26s %(levelname)-8s %(message)s')
+
+# Translation table for the ASCII column of log_hexdump(). Printable ASCII
+# characters are kept, all other bytes are shown as '.'.
+_HEXDUMP_ASCII_TABLE = bytes(
+    i if 0x20 <= i < 0x7f else 0x2e for i in range(256))
+# The printable ASCII characters.
+_HEXDUMP_PRINTABLE = bytes(range(0x20, 0x7f))
+
+
+def _checked_path(path: str, predicate, kind: str) -> Path:
+    """Return the string as a Path if its mode matches the predicate.
+
+        :param str path: String containing path to check.
+        :param predicate: Function testing the st_mode, e.g. stat.S_ISDIR.
+        :param str kind: Name of the expected kind of path for the error.
+        :return: The path.
+        :rtype: Path
+        :raise argparse.ArgumentTypeError: if the path does not exist, can
+            not be accessed, or is of the wrong kind.
+    """
+    try:
+        matches = predicate(os.stat(path).st_mode)
+    except (OSError, ValueError):
+        matches = False
+    if not matches:
+        raise argparse.ArgumentTypeError(
+            f'"{path}" is not a valid path to a {kind}')
+    return Path(path)
+
+
+def clear_path_cache():
+    """Forget the paths checked by dir_path() and file_path().
+
+        Long-running applications that parse arguments repeatedly should call
+        this when the file system may have changed.
+    """
+    dir_path.cache_clear()
+    file_path.cache_clear()
+
+
+@functools.lru_cache(maxsize=256)
 def dir_path(path: str) -> Path:
     """Convert the string to a path and return it if it is a directory.
 
         This function is intended to be used as the ``type`` argument to
         ``Argparser.add_argument()``.
 
+        Valid paths are cached, see clear_path_cache().
+
         :param str path: String containing path to check.
         :return: Path to a directory.
         :rtype: Path
         :raise argparse.ArgumentTypeError:
     """
-    if not os.path.isdir(path):
-        raise argparse.ArgumentTypeError(
-            f'"{path}" is not a valid path to a directory')
-    return Path(path)
+    return _checked_path(path, stat.S_ISDIR, 'directory')
 
 
 def exit_hard(returncode: int = 0):
     """Terminate the running application.
 
+        The process ends without running the exit handlers, so the log
+        records still queued for the log listener or held in the buffer of
+        a handler are written first.
+
         :param int returncode: Exit code to return to spawning shell.
     """
+    handlers = list(logging.getLogger().handlers)
+    if log_listener is not None:
+        _stop_log_listener(log_listener)
+        handlers.extend(log_listener.handlers)
+    for handler in handlers:
+        try:
+            handler.flush()
+        except (OSError, ValueError):
+            # The handler may already be closed.
+            pass
     os._exit(returncode)  # pylint: disable=protected-access
 
 
+@functools.lru_cache(maxsize=256)
 def file_path(path: str) -> Path:
     """Convert the string to a path and return it if it is a file.
 
+        Valid paths are cached, see clear_path_cache().
+
         :param str path: String containing path to check.
         :return: Path to a file.
         :rtype: Path
         :raise argparse.ArgumentTypeError:
     """
-    if not os.path.isfile(path):
-        raise argparse.ArgumentTypeError(
-            f'"{path}" is not a valid path to a file')
-    return Path(path)
+    return _checked_path(path, stat.S_ISREG, 'file')
 
 
 def get_language() -> str:
-    """Determine the language the current user has set their OS to."""
+    """Determine the language the current user has set their OS to.
+
+        On POSIX systems, 'C' is returned if no language is configured.
+    """
     if os.name == 'posix':
-        # BSD, Darwin, and Linux make it easy.
-        lang = os.environ['LANG'].split('.')[0]
+        # BSD, Darwin, and Linux make it easy. LANG is often not set in
+        # containers, so try the other variables and the locale as well.
+        environ = os.environ
+        lang = (environ.get('LANG') or environ.get('LC_ALL')
+                or environ.get('LC_MESSAGES') or '').split('.')[0]
+        if not lang:
+            lang = locale.getlocale()[0] or 'C'
     elif os.name == 'nt':
         windll = ctypes.windll.kernel32
         lang = locale.windows_locale[windll.GetUserDefaultUILanguage()]
@@ -119,43 +244,145 @@ def initialize_console():
 
         The solution for now is to reconfigure the codecs for stdout and
         stderr to always use UTF-8 and replace unmappable characters.
+        Streams that support it are reconfigured in place, which keeps the
+        fast io.TextIOWrapper. Other streams are wrapped in a codecs writer.
     """
     if os.name == 'nt':
-        if sys.stdout.encoding != 'utf-8':
-            sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'replace')
-            print('Reconfigured stdout to use utf-8 encoding.')
-        if sys.stderr.encoding != 'utf-8':
-            sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'replace')
-            print('Reconfigured stderr to use utf-8 encoding.')
+        for name in ('stdout', 'stderr'):
+            stream = getattr(sys, name)
+            if _stream_is_utf8(stream):
+                continue
+            if hasattr(stream, 'reconfigure'):
+                stream.reconfigure(encoding='utf-8', errors='replace')
+            else:
+                setattr(sys, name,
+                        codecs.getwriter('utf-8')(stream.buffer, 'replace'))
+            print(f'Reconfigured {name} to use utf-8 encoding.')
 
 
-def logging_add_trace():
-    """Add a loglevel TRACE.
+def _stream_is_utf8(stream) -> bool:
+    """Return True if the text stream encodes as UTF-8.
 
-        This function should be called only once.
+        The encoding name is normalized with codecs.lookup(), so spellings
+        like 'UTF-8', 'utf8' or 'cp65001' are recognized as well.
     """
-    if hasattr(logging_add_trace, "nr_calls"):
-        logging_add_trace.nr_calls += 1
-        logging.getLogger(__name__).warning(
-            'logging_add_trace() called %d times.',
-            logging_add_trace.nr_calls)
-        return
-    logging_add_trace.nr_calls = 1  # it doesn't exist yet, so initialize it
+    try:
+        return codecs.lookup(stream.encoding).name == 'utf-8'
+    except (AttributeError, LookupError, TypeError):
+        return False
+
+
+def _get_encoding() -> str:
+    """Return the encoding of the current locale.
+
+        locale.getencoding() (Python 3.11+) is used if available, because
+        locale.getpreferredencoding() is deprecated.
+    """
+    if hasattr(locale, 'getencoding'):
+        return locale.getencoding()
+    return locale.getpreferredencoding(False)
+
+
+def _is_utf8(encoding: str) -> bool:
+    """Return True if text is encoded as UTF-8.
+
+        This is the case if the encoding is UTF-8 or if Python runs in UTF-8
+        mode (PEP 540), which ignores the locale encoding.
+    """
+    return encoding.lower() in ('utf-8', 'utf8') or bool(sys.flags.utf8_mode)
+
 
-    if hasattr(logging, 'TRACE'):
-        logging.getLogger(__name__).debug('TRACE logging already enabled.')
+class _BufferedFileHandler(logging.FileHandler):
+    """A FileHandler that does not flush the file after every record.
+
+        The file is written when the buffer is full, on flush() and on
+        close(). logging.shutdown() does both at exit. Records still in the
+        buffer are lost if the process is killed.
+    """
+    def __init__(self, filename, mode: str = 'a', encoding: str = None,
+                 buffer_size: int = 1 << 16):
+        # Needed by _open(), which is called by the base class constructor.
+        self.buffer_size = buffer_size
+        super().__init__(filename, mode, encoding)
+
+    def _open(self):
+        """Open the file with a buffer of buffer_size bytes."""
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                    encoding=self.encoding, errors=self.errors)
+
+    def emit(self, record: logging.LogRecord):
+        """Write the record to the buffer without flushing it."""
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except RecursionError:
+            raise
+        except Exception:   # pylint: disable=broad-except
+            self.handleError(record)
+
+
+def _add_handlers(root_logger: logging.Logger,
+                  handlers: list[logging.Handler],
+                  async_logging: bool = False):
+    """Add the handlers to the root logger.
+
+        :param logging.Logger root_logger: The logger to add the handlers to.
+        :param list[logging.Handler] handlers: The handlers to add.
+        :param bool async_logging: If True, a QueueHandler is added to the
+            logger instead and the handlers are run by a QueueListener in a
+            background thread. The listener is stored in log_listener and
+            stopped at exit. A listener from a previous call is stopped
+            and replaced.
+    """
+    global log_listener, _log_queue_handler   # pylint: disable=global-statement
+    if async_logging:
+        if log_listener is None:
+            # The hook stops whichever listener is current at exit.
+            atexit.register(_stop_log_listener)
+        else:
+            _stop_log_listener(log_listener)
+            root_logger.removeHandler(_log_queue_handler)
+        log_queue = queue.SimpleQueue()
+        log_listener = QueueListener(log_queue, *handlers,
+                                     respect_handler_level=True)
+        log_listener.start()
+        _log_queue_handler = QueueHandler(log_queue)
+        root_logger.addHandler(_log_queue_handler)
+    else:
+        for handler in handlers:
+            root_logger.addHandler(handler)
 
-    # Perform function.
-    logging.TRACE = 9
-    logging.addLevelName(logging.TRACE, 'TRACE')
 
-    def trace(self, message, *args, **kws):
-        """Output message with level TRACE."""
-        if self.isEnabledFor(logging.TRACE):
-            # Logger takes its '*args' as 'args'.
-            self._log(logging.TRACE, message, args, **kws)  # pylint: disable=protected-access
+def _stop_log_listener(listener: QueueListener = None):
+    """Stop the listener unless it has already been stopped.
 
-    logging.Logger.trace = trace
+        :param QueueListener listener: The listener to stop. If None,
+            log_listener is stopped.
+    """
+    if listener is None:
+        listener = log_listener
+    # QueueListener.stop() fails if it is called a second time.
+    if listener is not None and listener._thread is not None:   # pylint: disable=protected-access
+        listener.stop()
+
+
+def logging_add_trace():
+    """Add the method trace() to all loggers.
+
+        The loglevel TRACE itself is registered when this module is
+        imported. Use the module-level trace() function to log with level
+        TRACE without modifying logging.Logger.
+
+        This function should be called only once. It is thread-safe.
+    """
+    global _trace_installed, _trace_nr_calls   # pylint: disable=global-statement
+    with _trace_lock:
+        _trace_nr_calls += 1
+        if _trace_installed:
+            logging.getLogger(__name__).warning(
+                'logging_add_trace() called %d times.', _trace_nr_calls)
+            return
+        logging.Logger.trace = _logger_trace
+        _trace_installed = True
 
 
 def logging_initialize(
@@ -165,7 +392,9 @@ def logging_initialize(
         log_rotation: int = 0,
         log_compression: int = 5,
         loglevel_console: int = logging.WARNING,
-        loglevel_file: int = logging.DEBUG) -> logging.Logger:
+        loglevel_file: int = logging.DEBUG,
+        async_logging: bool = False,
+        log_buffer_size: int = 1 << 16) -> logging.Logger:
     """Initialize the logging interface with the command line options
        passed through the object 'args'. An instance of the root logger is
        returned to the caller.
@@ -185,6 +414,14 @@ def logging_initialize(
             are retained.
         :param int loglevel_console: Loglevel filter of the console logger.
         :param int logfile_level: Loglevel filter of the file logger.
+        :param bool async_logging: If True, the console and file handlers
+            run in a background thread fed by a queue, so logging calls do
+            not block on output. Call log_listener.stop() to flush the
+            queue, which is done automatically at exit.
+        :param int log_buffer_size: Size in bytes of the log file buffer.
+            The file is only written when the buffer is full, on flush and
+            at exit. If set to 0, every record is flushed to the file
+            immediately.
         :return: The root logger instance for the application.
         :rtype logging.logger:
 
@@ -197,42 +434,51 @@ def logging_initialize(
     logger.setLevel(loglevel)
 
     # Configure the console handler.
-    lc = locale.getpreferredencoding()
-    if lc != 'utf-8':
+    lc = _get_encoding()
+    change_locale = not _is_utf8(lc)
+    if change_locale:
         locale.setlocale(locale.LC_CTYPE, 'C')
     initialize_console()
     ch = logging.StreamHandler()
     ch.setLevel(loglevel_console)
-    terseFormatter = logging.Formatter('%(levelname)-8s %(message)s')
-    ch.setFormatter(terseFormatter)
-    logger.addHandler(ch)
-    logger.debug('Logging to console initialized.')
+    ch.setFormatter(_TERSE_FMT)
+    handlers = [ch]
 
+    log_file_path = None
     if log_file_name_format is not None and log_dir_path is not None:
         log_file_name = string_from_format(log_file_name_format)
         log_file_path = log_dir_path / log_file_name
         rotate_file(log_file_name, log_dir_path, log_rotation, log_compression)
 
-        fh = logging.FileHandler(log_file_path, encoding='utf-8', mode='w')
+        if log_buffer_size > 0:
+            fh = _BufferedFileHandler(log_file_path, encoding='utf-8',
+                                      mode='w', buffer_size=log_buffer_size)
+        else:
+            fh = logging.FileHandler(log_file_path, encoding='utf-8', mode='w')
         fh.setLevel(loglevel_file)
-        verboseFormatter = logging.Formatter('%(asctime)s %(name)-26s %(levelname)-8s %(message)s')
-        fh.setFormatter(verboseFormatter)
-        logger.addHandler(fh)
+        fh.setFormatter(_VERBOSE_FMT)
+        handlers.append(fh)
+
+    _add_handlers(logger, handlers, async_logging)
+    logger.debug('Logging to console initialized.')
+    if log_file_path is not None:
         logger.debug('Logging to file "%s" initialized.', log_file_path)
 
-    if lc != 'utf-8':
-        if locale.getpreferredencoding() == 'utf-8':
+    if change_locale:
+        new_lc = _get_encoding()
+        if _is_utf8(new_lc):
             logger.debug('Changed encoding from "%s" to "utf-8".', lc)
-        elif lc == locale.getpreferredencoding():
+        elif lc == new_lc:
             logger.debug('Failed to change encoding from "%s" to "utf-8".', lc)
         else:
             logger.warning('Failed to change encoding from "%s" to "utf-8", got "%s".',
-                           lc, locale.getpreferredencoding())
+                           lc, new_lc)
 
     return logger
 
 
-def initialize_logging(args: argparse.Namespace):
+def initialize_logging(args: argparse.Namespace,
+                       async_logging: bool = False):
     """Initialize the logging interface with the command line options
        passed through the object 'args'. An instance of the root logger is
        returned to the caller.
@@ -240,17 +486,23 @@ def initialize_logging(args: argparse.Namespace):
        If a sub-module uses logging.getLogger('somename'), the logger will
        be a child of the root logger and inherit the settings made here.
 
+       :param bool async_logging: If True, the console and file handlers
+           run in a background thread fed by a queue, so logging calls do
+           not block on output. Call log_listener.stop() to flush the
+           queue, which is done automatically at exit.
        :return: The root logger instance for the application.
        :rtype logging.logger:
     """
 
-    # Define a new log level 'trace'
-    logging_add_trace()
+    # Add logger.trace() unless this has already been done.
+    if not _trace_installed and not hasattr(logging.Logger, 'trace'):
+        logging_add_trace()
 
     # args.loglevel contains the string value of the command line option
     # --loglevel.
-    numeric_log_level = getattr(logging, args.loglevel.upper(), None)
-    if not isinstance(numeric_log_level, int):
+    name_to_level = logging._nameToLevel  # pylint: disable=protected-access
+    numeric_log_level = name_to_level.get(args.loglevel.upper())
+    if numeric_log_level is None:
         raise ValueError(f'Invalid log level: {args.loglevel}')
 
     # Configure the root logger instance.
@@ -267,8 +519,9 @@ def initialize_logging(args: argparse.Namespace):
         fh = logging.FileHandler(app_name + '.log', encoding='utf-8', mode='w')
         fh.setLevel(logging.TRACE)
 
-    lc = locale.getpreferredencoding()
-    if lc != 'utf-8':
+    lc = _get_encoding()
+    change_locale = not _is_utf8(lc)
+    if change_locale:
         locale.setlocale(locale.LC_CTYPE, 'C')
 
     # Create a console handler.
@@ -276,32 +529,32 @@ def initialize_logging(args: argparse.Namespace):
     ch = logging.StreamHandler()
     ch.setLevel(numeric_log_level)
 
-    # Create a formatter and add it to the handlers.
-    terseFormatter = logging.Formatter('%(levelname)-8s %(message)s')
-    ch.setFormatter(terseFormatter)
+    # Add the formatters to the handlers.
+    ch.setFormatter(_TERSE_FMT)
     if args.debug:
-        verboseFormatter = logging.Formatter(
-            '%(asctime)s %(name)-26s %(levelname)-8s %(message)s')
-        fh.setFormatter(verboseFormatter)
+        fh.setFormatter(_VERBOSE_FMT)
 
     # Add the handlers to the logger.
-    logger.addHandler(ch)
+    handlers = [ch]
     if args.debug:
-        logger.addHandler(fh)
+        handlers.append(fh)
+    _add_handlers(logger, handlers, async_logging)
 
     if args.verbose:
         logger.info('Logging initialized.')
 
-    if lc != 'utf-8':
-        if locale.getpreferredencoding() == 'utf-8':
+    if change_locale:
+        new_lc = _get_encoding()
+        if _is_utf8(new_lc):
             logger.debug('Changed encoding from "%s" to "utf-8".', lc)
-        elif lc == locale.getpreferredencoding():
+        elif lc == new_lc:
             logger.debug('Failed to change encoding from "%s" to "utf-8".', lc)
         else:
             logger.warning('Failed to change encoding from "%s" to "utf-8", got "%s".',
-                           lc, locale.getpreferredencoding())
+                           lc, new_lc)
 
-    logger.debug('Parsed args are: %s', args)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Parsed args are: %s', args)
     return logger
 
 
@@ -312,7 +565,19 @@ def is_power_of_two(n: int) -> bool:
         :return: True if *n* is a power of two, False otherwise.
         :rtype: bool
     """
-    return (n != 0) and ((n & (n - 1)) == 0)
+    return n > 0 and n.bit_count() == 1
+
+
+if sys.version_info < (3, 10):
+    # int.bit_count() was added in Python 3.10.
+    def is_power_of_two(n: int) -> bool:  # pylint: disable=function-redefined
+        """Return True if the given number *n* is a power of two.
+
+            :param int n: number to check
+            :return: True if *n* is a power of two, False otherwise.
+            :rtype: bool
+        """
+        return n > 0 and not n & (n - 1)
 
 
 def log_hexdump(fn_logger: logging.Logger,
@@ -322,7 +587,8 @@ def log_hexdump(fn_logger: logging.Logger,
                 start_offset: int = 0,
                 first_prefix: str = '',
                 always_prefix: str = '',
-                show_ascii: bool = True):
+                show_ascii: bool = True,
+                max_lines_per_record: int = 512):
     """Log a pretty representation of the given bytes to the logger.
 
         ```
@@ -339,65 +605,93 @@ def log_hexdump(fn_logger: logging.Logger,
         :param str always_prefix: A string that will be printed before every
             line (except the first if first_prefix was specified).
         :param bool show_ascii: Print ASCII characters after the hex dump if True.
+            Bytes outside the printable ASCII range are shown as '.'.
+        :param int max_lines_per_record: The lines are logged together as
+            one multi-line record. Larger dumps are split into records of
+            at most this many lines.
     """
-    if len(first_prefix) == 0:
-        first_prefix = always_prefix
-    elif len(first_prefix) > len(always_prefix):
-        always_prefix += ' ' * (len(first_prefix) - len(always_prefix))
-    elif len(always_prefix) > len(first_prefix):
-        first_prefix += ' ' * (len(always_prefix) - len(first_prefix))
+    if not fn_logger.isEnabledFor(level):
+        # Nothing would be logged, so skip formatting the dump.
+        return
+    # Pad both prefixes to the same width.
+    width = max(len(first_prefix), len(always_prefix))
+    first_prefix = (first_prefix or always_prefix).ljust(width)
+    always_prefix = always_prefix.ljust(width)
+    if not isinstance(b, (bytes, bytearray)):
+        # E.g. a memoryview, which has neither translate() nor decode().
+        b = bytes(b)
     length = len(b)
-    offset = 0
-    first = True
+    if length == 0:
+        return
+    # Translation table for the ASCII column. If all bytes are printable
+    # ASCII (e.g. text protocols), they can be decoded without translation.
+    translate_table = _HEXDUMP_ASCII_TABLE
+    if show_ascii and b.isascii() and not b.translate(None, _HEXDUMP_PRINTABLE):
+        translate_table = None
+    ascii_part = ''
     if length <= bytes_per_line:
-        show_offset = False
-    else:
-        show_offset = True
-    while length > 0:
-        if length < bytes_per_line:
-            bytes_per_line = length
+        # A single line is shown without an offset.
+        if show_ascii:
+            if translate_table is None:
+                ascii_part = b.decode('ascii')
+            else:
+                ascii_part = b.translate(translate_table).decode('ascii')
+        fn_logger.log(level, '%s  %s  %s' % (first_prefix, b.hex(' '), ascii_part))
+        return
+
+    # The prefixes, including the separator to the data, are the same for
+    # every line.
+    prefix = first_prefix + '  '
+    line_prefix_rest = always_prefix + '  '
+    lines = []
+    append = lines.append
+    # Slicing stops at the end of b, so the last (partial) line needs no
+    # special handling.
+    for offset in range(0, length, bytes_per_line):
         b_slice = b[offset:offset + bytes_per_line]
-        hs = b_slice.hex(' ')
-        if first:
-            s = f'{first_prefix}  '
-            first = False
-        else:
-            s = f'{always_prefix}  '
-        if show_offset:
-            s += f'{offset + start_offset:08x}  {hs}  '
-        else:
-            s += f'{hs}  '
         if show_ascii:
-            for c in b_slice:
-                c = chr(c)
-                if c.isprintable():
-                    s += c
-                else:
-                    s += '.'
-        fn_logger.log(level, s)
-        length -= bytes_per_line
-        offset += bytes_per_line
+            if translate_table is None:
+                ascii_part = b_slice.decode('ascii')
+            else:
+                ascii_part = b_slice.translate(translate_table).decode('ascii')
+        append('%s%08x  %s  %s' % (prefix, offset + start_offset,
+                                   b_slice.hex(' '), ascii_part))
+        if len(lines) >= max_lines_per_record:
+            fn_logger.log(level, '\n'.join(lines))
+            lines.clear()
+        prefix = line_prefix_rest
+    if lines:
+        fn_logger.log(level, '\n'.join(lines))
 
 
 def log_stacktrace(fn_logger: logging.Logger,
-                   level: int = logging.DEBUG):
+                   level: int = logging.DEBUG,
+                   limit: int = None):
     """Log the current stack trace inside or outside an exception.
 
         :param logging.Logger fn_logger: The logger to log to.
         :param int level: Level for logging (e.g. CRITICAL, ERROR, .. DEBUG)
+        :param int limit: The maximum number of frames shown for the stack
+            and for the exception, None to show all. The innermost frames
+            are kept, so the walk stops early for deep stacks.
     """
+    if not fn_logger.isEnabledFor(level):
+        # Nothing would be logged, so do not walk the stack.
+        return
     # Get the current exception.
     ex = sys.exc_info()[0]
-    # Remove this method from the call stack.
-    stack = traceback.extract_stack()[:-1]
+    # Start the walk above this method, so its frame is never extracted. If
+    # an exception is present, also leave out the call of this method.
+    frame = sys._getframe(1)  # pylint: disable=protected-access
     if ex is not None:
-        # Exception is present, so remove the call of this method.
-        del stack[-1]
-    fn_logger.log(level, 'Traceback (most recent call last):')
-    for s in traceback.format_list(stack):
-        fn_logger.log(level, s)
+        frame = frame.f_back
+    lines = ['Traceback (most recent call last):\n']
+    if frame is not None:
+        lines.extend(traceback.format_stack(frame, limit))
     if ex is not None:
-        fn_logger.log(level, traceback.format_exc())
+        lines.append(traceback.format_exc(limit))
+    # Log everything as a single record.
+    fn_logger.log(level, ''.join(lines).rstrip('\n'))
 
 
 def resolve_wildcards(filenames: list[str]) -> list[Path]:
@@ -405,21 +699,20 @@ def resolve_wildcards(filenames: list[str]) -> list[Path]:
 
         :param list[str] filenames: A list of filenames that may contain
              wildcards.
-        :return: A list of unique Paths.
+        :return: A list of unique Paths in the order they were first found.
         :rtype list[Path]:
     """
-    # Resolve wildcards.
-    names = []
-    for n in filenames:
-        i = glob.glob(n)
-        if i:
-            names.extend(i)
-    # Remove duplicates
-    names = list(set(names))
+    # Resolve wildcards and remove duplicates. The dict keeps the order.
+    names = {}
+    for pattern in filenames:
+        if glob.has_magic(pattern):
+            names.update(dict.fromkeys(glob.iglob(pattern)))
+        elif os.path.lexists(pattern):
+            # Without wildcards, glob would only check that the path exists.
+            names[pattern] = None
 
     # Convert strings to paths.
-    paths = [Path(n) for n in names]
-    return paths
+    return [Path(n) for n in names]
 
 
 def rotate_file(file_name: str,
@@ -438,34 +731,43 @@ def rotate_file(file_name: str,
         The initial file (with no .rotation suffix) gains a suffix. If
         compress_level > 0, the initial file is also compressed.
 
-        :note: Uses TRACE level logging.
+        :note: Uses TRACE level logging, logging_add_trace() is not needed.
     """
     fn_logger.debug('rotate_log(%s, %s, %d)', file_name, file_dir, rotation)
     if rotation == 0:
-        fn_logger.trace('rotate_log(): nothing to rotate.')
+        trace(fn_logger, 'rotate_log(): nothing to rotate.')
         return
 
+    # Read the directory once instead of probing every possible name. Each
+    # name is only looked up before the loop has renamed anything to it.
+    try:
+        with os.scandir(file_dir) as it:
+            entries = {entry.name: entry for entry in it}
+    except FileNotFoundError:
+        entries = {}
+
     max_rotation = rotation
     while rotation >= 0:
         if rotation == 0:
-            candidate = file_dir / file_name
-            if not candidate.exists():
-                fn_logger.trace('rotate_log(): rotation 0 does not exists. Done.')
+            if file_name not in entries:
+                trace(fn_logger, 'rotate_log(): rotation 0 does not exists. Done.')
                 return
+            candidate = file_dir / file_name
         else:
             # Find previously rotated candidate.
-            candidate = file_dir / f'{file_name}.{rotation}'
+            candidate_name = f'{file_name}.{rotation}'
             candidate_is_compressed = False
-            if not candidate.exists():
-                candidate = file_dir / f'{file_name}.{rotation}.gz'
+            if candidate_name not in entries:
+                candidate_name += '.gz'
                 candidate_is_compressed = True
-                if not candidate.exists():
-                    fn_logger.trace('rotate_log(): rotation %d does not exist.', rotation)
+                if candidate_name not in entries:
+                    trace(fn_logger, 'rotate_log(): rotation %d does not exist.', rotation)
                     rotation -= 1
                     continue
+            candidate = file_dir / candidate_name
 
         # We have found a match.
-        fn_logger.trace('rotate_log(): found candidate %s.', candidate)
+        trace(fn_logger, 'rotate_log(): found candidate %s.', candidate)
         if rotation == 0:
             # All other rotation copies have been renamed, now the last logfile
             # must be compressed (optional) and renamed.
@@ -473,28 +775,32 @@ def rotate_file(file_name: str,
             if compress_level > 0:
                 new_name = f'{file_name}.1.gz'
                 new_path = file_dir / new_name
-                fn_logger.trace('rotate_log(): compress %s -> %s.', compress_path, new_path)
-                with open(compress_path, 'rb') as f_in:
-                    # Get the modification time of the file we are rotating
-                    # so it will be stored correctly in the gzip archive.
-                    statinfo = os.stat(compress_path)
-                    with open(new_path, 'wb') as f_out:
-                        with gzip.GzipFile(file_name,
-                                           'wb',
-                                           compress_level,
-                                           f_out,
-                                           mtime=statinfo.st_mtime) as f_zip:
-                            shutil.copyfileobj(f_in, f_zip)
-
-                fn_logger.trace('rotate_log(): unlink %s.', compress_path)
+                trace(fn_logger, 'rotate_log(): compress %s -> %s.', compress_path, new_path)
+                # Get the modification time of the file we are rotating
+                # so it will be stored correctly in the gzip archive. The
+                # file has not been touched since the directory was read.
+                # On Windows, the directory entry already holds the result.
+                statinfo = entries[file_name].stat()
+                # The original file name is stored in the gzip header, so the
+                # archive is written through GzipFile with an explicit name.
+                with open(compress_path, 'rb') as f_in, \
+                        open(new_path, 'wb') as f_out, \
+                        gzip.GzipFile(file_name, 'wb', compress_level, f_out,
+                                      mtime=statinfo.st_mtime) as f_zip:
+                    # Large chunks mean fewer calls through the gzip layer.
+                    shutil.copyfileobj(f_in, f_zip, _ROTATE_COPY_BUFFER_SIZE)
+                # Keep the timestamps of the rotated file on the archive.
+                os.utime(new_path, ns=(statinfo.st_atime_ns, statinfo.st_mtime_ns))
+
+                trace(fn_logger, 'rotate_log(): unlink %s.', compress_path)
                 compress_path.unlink()
             else:
                 new_path = file_dir / f'{file_name}.{rotation + 1}'
-                fn_logger.trace('rotate_log(): rename %s -> %s', candidate, new_path)
+                trace(fn_logger, 'rotate_log(): rename %s -> %s', candidate, new_path)
                 candidate.rename(new_path)
         elif rotation == max_rotation:
             # We have found the maximum rotation file. Delete it to make room.
-            fn_logger.trace('rotate_log(): unlinking old %s.', candidate)
+            trace(fn_logger, 'rotate_log(): unlinking old %s.', candidate)
             candidate.unlink()
         elif rotation > 0:
             # Rename existing rotation to next higher.
@@ -502,7 +808,7 @@ def rotate_file(file_name: str,
                 new_path = file_dir / f'{file_name}.{rotation + 1}.gz'
             else:
                 new_path = file_dir / f'{file_name}.{rotation + 1}'
-            fn_logger.trace('rotate_log(): rename %s -> %s', candidate, new_path)
+            trace(fn_logger, 'rotate_log(): rename %s -> %s', candidate, new_path)
             candidate.rename(new_path)
         rotation -= 1
 
@@ -510,36 +816,56 @@ def rotate_file(file_name: str,
 def round_down(n: int, m: int) -> int:
     """Round the given number *n* down to the nearest multiple of *m*.
 
+        If *m* is a power of two, a bit mask is used, otherwise integer
+        division.
+
         :param int n: number to round
         :param int m: multiple to round to
         :return: n rounded down to a multiple of m.
         :rtype int:
     """
-    return n & ~(m - 1)
+    mm = m - 1
+    if m & mm:
+        return (n // m) * m
+    return n & ~mm
 
 
 def round_up(n: int, m: int) -> int:
     """Round the given number *n* up to the nearest multiple of *m*.
 
+        If *m* is a power of two, a bit mask is used, otherwise integer
+        division.
+
         :param int n: number to round
         :param int m: multiple to round to
         :return: n rounded up to a multiple of m.
         :rtype int:
     """
-    return (n + m - 1) & ~(m - 1)
+    mm = m - 1
+    if m & mm:
+        return ((n + mm) // m) * m
+    return (n + mm) & ~mm
 
 
 @contextlib.contextmanager
-def std_open(filename: str = None, mode: str = 'w', encoding: str = 'utf-8'):
+def std_open(filename: str = None, mode: str = 'w', encoding: str = 'utf-8',
+             buffering: int = None):
     """Open either a file or stdin/stdout for use with `with`.
 
         If the filename is None or '-' then stdin or stdout (depending on the
         mode) are used.
         Otherwise, the file is used. I is closed when the `with` block is done.
 
+        In binary mode ('b' in mode), no encoding is used and the binary
+        buffers of stdin/stdout are returned.
+
         :param str filename: A filename, '-', or None.
         :param str mode: The mode to use for open().
-        :param str encoding: The encoding to pass to open(). Defaults to 'utf-8'.
+        :param str encoding: The encoding to pass to open() in text mode.
+            Defaults to 'utf-8'.
+        :param int buffering: The buffer size to pass to open(). None uses
+            a 1 MiB buffer for files opened for writing and the default
+            buffer size otherwise.
 
         ## Example
         ```
@@ -547,18 +873,27 @@ def std_open(filename: str = None, mode: str = 'w', encoding: str = 'utf-8'):
                 c = f.read()
         ```
     """
+    binary = 'b' in mode
     if filename and filename != '-':
-        fh = open(filename, mode, encoding=encoding)
+        if buffering is None:
+            buffering = -1 if 'r' in mode else _STD_OPEN_WRITE_BUFFER_SIZE
+        fh = open(filename, mode,
+                  buffering=buffering,
+                  encoding=None if binary else encoding)
+        is_std = False
     else:
         if 'r' in mode:  # pylint: disable=else-if-used
             fh = sys.stdin
         else:  # 'w'
             fh = sys.stdout
+        if binary:
+            fh = fh.buffer
+        is_std = True
 
     try:
         yield fh
     finally:
-        if fh is not sys.stdin and fh is not sys.stdout:
+        if not is_std:
             fh.close()
 
 
@@ -571,16 +906,8 @@ def string_from_format(fmt: str) -> str:
         :param str fmt: Format string to parse.
         :return: Resulting string.
     """
-    fmt2 = ''
     if '%P' in fmt:
-        start = 0
-        pos = fmt.find('%P', start)
-        while pos >= 0:
-            length = pos - start
-            fmt2 += fmt[start:length] + Path(sys.argv[0]).stem
-            start = pos + 2
-            pos = fmt.find('%P', start)
-        fmt2 += fmt[start:]
+        fmt2 = _APP_STEM.join(fmt.split('%P'))
     else:
         fmt2 = fmt
 
@@ -589,12 +916,20 @@ def string_from_format(fmt: str) -> str:
 
 
 def true_stem(path: Path) -> str:
-    """Return the true stem (e.g. the name without suffixes) of the Path."""
-    ts = path.stem
-    while path.suffixes:
-        ts = path.stem
-        path = Path(ts)
-    return ts
+    """Return the true stem (e.g. the name without suffixes) of the Path.
+
+        Suffixes follow the rules of pathlib: leading dots (hidden files) and
+        a trailing dot do not start a suffix.
+    """
+    name = path.name
+    if name.endswith('.') or '.' not in name.lstrip('.'):
+        # No suffixes. Path.stem is returned as before, which still splits
+        # names starting with several dots, e.g. '..a' gives '.'.
+        return path.stem
+    # Strip one suffix at a time on the string instead of creating a Path.
+    while not name.endswith('.') and '.' in name.lstrip('.'):
+        name = name[:name.rfind('.')]
+    return name
 
 
 if __name__ == '__main__':